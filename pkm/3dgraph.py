@@ -12,196 +12,448 @@
 • All performance tweaks preserved (cached layout, uirevision, no cones)
 """
 
-import json, pathlib, pandas as pd, networkx as nx, numpy as np, plotly.graph_objects as go
+import base64, hashlib, html, json, os, pathlib, pandas as pd, numpy as np, plotly.graph_objects as go
 import re
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import orjson
+from scipy.optimize import minimize
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
 
 # ── CONFIG ────────────────────────────────────────────────────────
 CSV_FILE       = "relations.csv"
+FACTS_FILE     = "facts.pl"
 ITERATIONS     = 100
 SPACING_VALUES = [0.25, 0.5, 1, 2, 4, 8]     # ← updated
 REPEL_VALUES   = [0.5, 1, 2, 4, 8, 16]  # ← new slider values
 ARROW_FRAC     = 0.12
-
-# ── NOTE FILE LOOKUP ─────────────────────────────────────────────-
-FACTS_FILE     = "facts.pl"
-note_files = {}
-note_re = re.compile(r"note\(([^,]+),\s*'([^']+)'\)")
-try:
-    with open(FACTS_FILE) as f:
-        for line in f:
-            m = note_re.search(line)
-            if m:
-                note_files[m.group(1)] = m.group(2)
-except FileNotFoundError:
-    pass
-
-# ── LOAD GRAPH ────────────────────────────────────────────────────
-df = pd.read_csv(CSV_FILE)
-G  = nx.from_pandas_edgelist(df, "Source", "Target",
-                             edge_attr="Label", create_using=nx.DiGraph())
-
-# ── LAYOUTS PER REPULSIVE VALUE (cached) ─────────────────────────
-layouts = {}
-for k in REPEL_VALUES:
-    cf = pathlib.Path(f"layout_{k}.json")
-    if cf.exists():
-        layouts[k] = {n: np.array(p) for n, p in json.load(cf.open()).items()}
-    else:
-        layouts[k] = nx.spring_layout(G, dim=3, seed=42, iterations=ITERATIONS, k=k)
-        json.dump({n: layouts[k][n].tolist() for n in G}, cf.open("w"))
-
-DEFAULT_K = REPEL_VALUES[1]
-pos0 = layouts[DEFAULT_K]
-
-comp_id  = {n: i for i, c in enumerate(nx.connected_components(G.to_undirected()))
-            for n in c}
-centroid = {cid: np.mean([pos0[n] for n in G if comp_id[n]==cid], axis=0)
-            for cid in set(comp_id.values())}
-
-node_text_plain = list(G.nodes())
-node_text_bold  = [f"<b>{t}</b>" for t in node_text_plain]
-node_files      = [note_files.get(n, "") for n in G]
-
-# ── COORD ARRAYS PER SPACING ─────────────────────────────────────
-def arrays_for(pos_base, sp):
-    pos = {n: pos_base[n] + (sp-1)*centroid[comp_id[n]] for n in G}
-    node_xyz = np.array([pos[n] for n in G]).T
-
-    edge = [[], [], []]; arrow = [[], [], []]
-    for u, v in G.edges():
-        p0, p1 = pos[u], pos[v]
-        edge[0] += [p0[0], p1[0], None]
-        edge[1] += [p0[1], p1[1], None]
-        edge[2] += [p0[2], p1[2], None]
-
-        head = p1 - ARROW_FRAC*(p1-p0)
-        arrow[0] += [head[0], p1[0], None]
-        arrow[1] += [head[1], p1[1], None]
-        arrow[2] += [head[2], p1[2], None]
-
-    lx, ly, lz, ltxt = [], [], [], []
-    for u, v, d in G.edges(data=True):
-        p0, p1 = pos[u], pos[v]
-        lx.append((p0[0]+p1[0])/2)
-        ly.append((p0[1]+p1[1])/2)
-        lz.append((p0[2]+p1[2])/2)
-        ltxt.append(d["Label"])
-
-    return dict(node=node_xyz,
-                edge=edge,
-                arrow=arrow,
-                edge_lbl=(lx, ly, lz, ltxt),
-                node_lbl=node_xyz)
-
-arrays = {k: {s: arrays_for(layouts[k], s) for s in SPACING_VALUES}
-          for k in REPEL_VALUES}
-
-# ── TRACE FACTORY ────────────────────────────────────────────────
-def sc3d(x, y, z, **kw):
-    t = go.Scatter3d(x=x, y=y, z=z, **kw); t.uirevision = "static"; return t
-
-a1 = arrays[DEFAULT_K][1]
-
-edge_t  = sc3d(*a1["edge"],  mode="lines", line=dict(width=1), hoverinfo="none")
-arrow_t = sc3d(*a1["arrow"], mode="lines", line=dict(width=4),
-               hoverinfo="none", visible=False)
-lx,ly,lz,lt = a1["edge_lbl"]
-edge_lbl_t = sc3d(lx,ly,lz, mode="text", text=lt,
-                  hoverinfo="none", visible=False)
-
-# Node-label trace (ON by default)
-node_lbl_t = sc3d(*a1["node_lbl"],
-    mode="markers+text",
-    marker=dict(size=12, symbol="square", color="#fff7b2", line=dict(width=0)),
-    text=node_text_bold,
-    textfont=dict(color="black"),
-    hoverinfo="none",
-    customdata=node_files,
-    visible=True)                      # ← now visible by default
-
-# Node spheres (OFF by default)
-node_t = sc3d(*a1["node"], mode="markers",
-              marker=dict(size=6, opacity=0.85),
-              hovertext=node_text_plain,
-              customdata=node_files,
-              visible=False)           # ← now hidden by default
-
-fig = go.Figure(data=[edge_t, arrow_t, edge_lbl_t, node_lbl_t, node_t])
-
-# ── SLIDER (restyle) ─────────────────────────────────────────────
-# Create a JavaScript variable to store the arrays data
-arrays_js = json.dumps({
-    str(k): {
-        str(s): {
-            "edge": [arrays[k][s]["edge"][i] for i in range(3)],
-            "arrow": [arrays[k][s]["arrow"][i] for i in range(3)],
-            "edge_lbl": [arrays[k][s]["edge_lbl"][i] for i in range(4)],
-            "node_lbl": [arrays[k][s]["node_lbl"][i].tolist() for i in range(3)],
-            "node": [arrays[k][s]["node"][i].tolist() for i in range(3)]
-        } for s in SPACING_VALUES
-    } for k in REPEL_VALUES
-})
-
-# Create dummy steps that will be handled by JavaScript
-steps = []
-for i, s in enumerate(SPACING_VALUES):
-    steps.append(dict(
-        label=str(s),
-        method="relayout",
-        args=[{}]  # Empty args, will be handled by JS
-    ))
-
-repel_steps = []
-for j, k in enumerate(REPEL_VALUES):
-    repel_steps.append(dict(
-        label=str(k),
-        method="relayout",
-        args=[{}]  # Empty args, will be handled by JS
-    ))
-
-fig.update_layout(
-    sliders=[
-        dict(steps=steps, active=SPACING_VALUES.index(1),
-             x=0.02, y=-0.05, xanchor="left", len=0.45,
-             currentvalue=dict(visible=False)),
-        dict(steps=repel_steps, active=REPEL_VALUES.index(DEFAULT_K),
-             x=0.55, y=-0.05, xanchor="left", len=0.4,
-             currentvalue=dict(visible=False))
-    ],
-
-    # ── SINGLE-TOGGLE BUTTONS ────────────────────────────────────
-    updatemenus=[dict(
-        type="buttons", x=1.05, y=0.8,
-        buttons=[
-            dict(label="⚲ Edge labels",
-                 method="restyle",
-                 args=[{"visible":[True]}, [2]],
-                 args2=[{"visible":[False]}, [2]]),
-
-            dict(label="⇢ Arrowheads",
-                 method="restyle",
-                 args=[{"visible":[True]}, [1]],
-                 args2=[{"visible":[False]}, [1]]),
-
-            dict(label="🔤 Node labels",
-                 method="restyle",
-                 args=[{"visible":[True]}, [3]],
-                 args2=[{"visible":[False]}, [3]])
-        ]
-    )],
-
-    scene=dict(xaxis_visible=False, yaxis_visible=False, zaxis_visible=False, dragmode='orbit'),
-    margin=dict(l=0, r=0, t=0, b=0),
-    clickmode="event+select"
-)
-
-CLICK_JS = f"""
+COARSEN_MIN    = 100    # graphs this big start from a multilevel layout
+DENSE_MAX      = 10000  # up to this many nodes repulsion is summed exactly
+POOL_MIN       = 2000   # below this, worker start-up costs more than a layout
+
+# note(Name, 'path'). facts, one per line; read in a single scan
+NOTE_RE = re.compile(r"^[ \t]*note\(([^,\n]+),[ \t]*'([^'\n]+)'\)", re.M)
+
+# ── FORCE LAYOUT ─────────────────────────────────────────────────
+NEAR = np.stack(np.meshgrid(*[[-1, 0, 1]]*3, indexing="ij"), -1).reshape(-1, 3)
+KIDS = np.stack(np.meshgrid(*[[0, 1]]*3, indexing="ij"), -1).reshape(-1, 3)
+SPLIT = (2*NEAR[:, None, :] + KIDS[None, :, :]).reshape(-1, 3)  # children of parent's neighbours
+
+MAX_DEPTH = 20   # octree levels; cell keys pack 3×21-bit coordinates
+
+def dense_repulsion(P, k, block=1024):
+    """Exact repulsion −k²·log d over all pairs, *block* rows at a time.
+
+    Squared distances come from the Gram matrix, so each block is a
+    matrix product plus a few passes over a (block, n) array.
+    """
+    n, kk = len(P), k*k
+    sq    = np.einsum("ij,ij->i", P, P)
+    E, g  = 0.0, np.empty_like(P)
+    for s in range(0, n, block):
+        Q    = P[s:s+block]
+        r    = np.arange(len(Q))
+        d2   = sq[s:s+block, None] + sq[None, :] - 2*(Q @ P.T)
+        np.maximum(d2, 1e-4, out=d2)
+        d2[r, s+r] = 1.0                               # log 1 = 0 on the diagonal
+        E   -= 0.25*kk * np.log(d2).sum()              # each pair seen from both ends
+        inv  = np.divide(kk, d2, out=d2)
+        inv[r, s+r] = 0.0
+        g[s:s+block] = inv @ P - inv.sum(axis=1)[:, None]*Q
+    return E, g
+
+def _cell_key(c):
+    return (c[..., 0] << 42) | (c[..., 1] << 21) | c[..., 2]
+
+def _find(keys, want):
+    """Indices of *want* in sorted *keys*, and which of them are present."""
+    pos = np.minimum(np.searchsorted(keys, want), len(keys) - 1)
+    return pos, keys[pos] == want
+
+def _members(cells, start, order, mass):
+    """Nodes of each of *cells* (repeats allowed), and how many per cell."""
+    cnt = mass[cells]
+    return order[np.repeat(start[cells] - np.cumsum(cnt) + cnt, cnt) + np.arange(cnt.sum())], cnt
+
+def octree_repulsion(P, k, leaf=8):
+    """Barnes–Hut repulsion −k²·log d over an octree on P's bounding cube.
+
+    Only occupied cells are kept (sorted keys, looked up by binary search),
+    and the tree is refined until no leaf holds more than *leaf* nodes, so
+    a far outlier costs a few nearly empty levels rather than one huge
+    leaf.  Per level, a node sees the occupied cells whose parent
+    neighbours its own parent but which are not adjacent to its cell
+    (size/distance ≲ 1) through their centre of mass; pairs in adjacent
+    leaf cells are summed exactly.  Returns energy and gradient.
+    """
+    n, kk = len(P), k*k
+    E, g  = 0.0, np.zeros_like(P)
+    U     = (P - P.min(axis=0)) / max(float(np.ptp(P, axis=0).max()), 1e-12)
+    X     = np.minimum((U * 2**MAX_DEPTH).astype(np.int64), 2**MAX_DEPTH - 1)
+
+    for level in range(1, MAX_DEPTH+1):
+        m    = 2**level
+        cell = X >> (MAX_DEPTH - level)
+        keys, first, cid, mass = np.unique(_cell_key(cell), return_index=True,
+                                           return_inverse=True, return_counts=True)
+        cell  = cell[first]                            # one row per occupied cell
+        order = np.argsort(cid, kind="stable")
+        start = np.concatenate(([0], np.cumsum(mass)))
+        com   = np.stack([np.bincount(cid, P[:, a], len(keys)) for a in range(3)], 1)
+        com  /= mass[:, None]
+
+        b  = 2*(cell // 2)[:, None, :] + SPLIT
+        ok = ((b >= 0) & (b < m)).all(-1) & (np.abs(b - cell[:, None, :]).max(-1) > 1)
+        a, c   = np.nonzero(ok)
+        bid, hit = _find(keys, _cell_key(b[a, c]))
+        i, cnt = _members(a[hit], start, order, mass)
+        bid    = np.repeat(bid[hit], cnt)
+        w      = mass[bid]
+        d      = P[i] - com[bid]
+        d2     = np.maximum(np.einsum("ij,ij->i", d, d), 1e-4)
+        E     -= 0.25*kk * (w * np.log(d2)).sum()
+        f      = kk * w / d2
+        for ax in range(3):
+            g[:, ax] -= np.bincount(i, d[:, ax] * f, n)
+        if mass.max() <= leaf:
+            break
+
+    # exact near field: every node against the nodes of its 27 leaf neighbours
+    b = cell[:, None, :] + NEAR
+    a, c   = np.nonzero(((b >= 0) & (b < m)).all(-1))
+    bid, hit = _find(keys, _cell_key(b[a, c]))
+    i, cnt = _members(a[hit], start, order, mass)
+    j, cnt = _members(np.repeat(bid[hit], cnt), start, order, mass)
+    i      = np.repeat(i, cnt)
+    i, j   = i[i != j], j[i != j]
+    d      = P[i] - P[j]
+    d2     = np.maximum(np.einsum("ij,ij->i", d, d), 1e-4)
+    E     -= 0.25*kk * np.log(d2).sum()
+    f      = kk / d2
+    for ax in range(3):
+        g[:, ax] -= np.bincount(i, d[:, ax] * f, n)
+    return E, g
+
+def layout_energy(x, edges_idx, k, gravity):
+    """FR energy and its gradient for flattened (n,3) positions *x*.
+
+    Attraction d³/3k along edges (force d²/k); repulsion −k²·log d between
+    all pairs (force k²/d), exact up to DENSE_MAX nodes and approximated
+    by octree_repulsion beyond; plus a constant-magnitude pull *gravity*
+    toward the origin.  The exact sum keeps energy and gradient consistent,
+    which L-BFGS's line search relies on.
+    """
+    P = x.reshape(-1, 3)
+    r = np.maximum(np.sqrt(np.einsum("ij,ij->i", P, P)), 1e-6)
+
+    src, dst = edges_idx[:, 0], edges_idx[:, 1]
+    d    = P[src] - P[dst]
+    dist = np.sqrt(np.einsum("ij,ij->i", d, d))
+    pull = d * (dist / k)[:, None]
+    E, g = (dense_repulsion if len(P) <= DENSE_MAX else octree_repulsion)(P, k)
+    E   += (dist**3).sum() / (3*k) + gravity * r.sum()
+    g   += P * (gravity / r)[:, None]
+    np.add.at(g, src, pull)
+    np.subtract.at(g, dst, pull)
+    return E, g.ravel()
+
+def coarsen(n, edges_idx, rng):
+    """Contract a random maximal matching of the edges.
+
+    Returns the coarse index of every node; matched pairs share one.
+    """
+    mate = np.arange(n)
+    for u, v in edges_idx[rng.permutation(len(edges_idx))]:
+        if u != v and mate[u] == u and mate[v] == v:
+            mate[u], mate[v] = v, u
+    return np.unique(np.minimum(np.arange(n), mate), return_inverse=True)[1]
+
+def relax(x0, edges_idx, k, iterations):
+    """L-BFGS on layout_energy from flattened start positions *x0*."""
+    n = len(x0) // 3
+    return minimize(layout_energy, x0, args=(edges_idx, k, n**(2/3)), jac=True,
+                    method="L-BFGS-B", options={"maxiter": iterations}).x
+
+def multilevel(n, edges_idx, k, rng, iterations):
+    """Relaxed positions from a random start, or for big graphs a coarse one.
+
+    From COARSEN_MIN nodes up the graph is contracted by a matching and
+    laid out recursively; both halves of each pair start at their coarse
+    node's position, scaled by the ∛n growth of the layout, with a little
+    jitter to split them.  A level seeded that way is already close, so it
+    gets a quarter of the iterations.  Stops coarsening when a matching no
+    longer shrinks the graph by a tenth.
+    """
+    if n >= COARSEN_MIN:
+        parent = coarsen(n, edges_idx, rng)
+        nc = int(parent.max()) + 1
+        if nc < 0.9*n:
+            ce = np.sort(parent[edges_idx], axis=1)
+            ce = np.unique(ce[ce[:, 0] != ce[:, 1]], axis=0)
+            P  = multilevel(nc, ce, k, rng, iterations).reshape(-1, 3)[parent]
+            P  = P*np.cbrt(n / nc) + rng.uniform(-0.25, 0.25, P.shape)*k
+            return relax(P.ravel(), edges_idx, k, iterations//4)
+    return relax(rng.uniform(-1, 1, 3*n) * k * np.cbrt(n), edges_idx, k, iterations)
+
+def lbfgs_layout(n, edges_idx, k, iterations=ITERATIONS, seed=42):
+    """3-D force layout by L-BFGS on layout_energy, scaled into [-1, 1].
+
+    Pure FR is scale-free in k (a larger k only zooms out); the fixed
+    n^⅔ gravity gives it a length scale, so raising k pushes components
+    apart against the pull instead.
+    """
+    rng = np.random.default_rng(seed)
+    P = multilevel(n, edges_idx, k, rng, iterations).reshape(-1, 3)
+    P -= P.mean(axis=0)
+    return P / max(float(np.abs(P).max()), 1e-12)
+
+def graph_key(node_list, edges_idx):
+    """Digest of what a layout depends on: node order, edges, settings."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{ITERATIONS} {COARSEN_MIN} {DENSE_MAX}\n".encode())
+    h.update("\n".join(map(str, node_list)).encode())
+    h.update(np.ascontiguousarray(edges_idx, dtype="<i8").tobytes())
+    return h.hexdigest()
+
+def read_layout(path, key):
+    """Cached positions from *path* if it holds a layout for *key*, else None.
+
+    Unreadable or malformed files count as missing; the rebuild overwrites them.
+    """
+    try:
+        cached = orjson.loads(path.read_bytes())
+    except (OSError, orjson.JSONDecodeError):
+        return None
+    if not (isinstance(cached, dict) and cached.get("key") == key
+            and isinstance(cached.get("pos"), dict)):
+        return None
+    return cached["pos"]
+
+def write_layout(path, key, node_list, P):
+    """Write a layout cache via a temp file, so a crash never leaves half of one."""
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(orjson.dumps(dict(key=key, pos=dict(zip(node_list, np.round(P, 6)))),
+                                 option=orjson.OPT_SERIALIZE_NUMPY))
+    os.replace(tmp, path)
+
+
+def main():
+    # ── NOTE FILE LOOKUP ─────────────────────────────────────────────-
+    try:
+        note_files = dict(NOTE_RE.findall(pathlib.Path(FACTS_FILE).read_text()))
+    except FileNotFoundError:
+        note_files = {}
+
+    # ── LOAD GRAPH ────────────────────────────────────────────────────
+    df = pd.read_csv(CSV_FILE, usecols=["Source", "Target", "Label"], dtype="string")
+
+    # nodes in order of first appearance, row by row (source before target)
+    node_list = list(pd.unique(df[["Source", "Target"]].to_numpy().ravel()))
+    node_idx  = {n: i for i, n in enumerate(node_list)}
+
+    # one edge per (source, target), its distinct labels joined so parallel
+    # rows draw as one segment; endpoints as (|E|,2) row indices into the
+    # per-node position matrix.  Only pairs that repeat go through groupby.
+    df    = df.fillna({"Label": ""}).drop_duplicates()
+    first = ~df.duplicated(["Source", "Target"])
+    rep   = df.duplicated(["Source", "Target"], keep=False)
+    edges = df[first].copy()
+    if rep.any():
+        joined = (df[rep & df.Label.ne("")]
+                    .groupby(["Source", "Target"], sort=False).Label.agg(", ".join))
+        multi  = edges[rep[first]]
+        at     = pd.MultiIndex.from_frame(multi[["Source", "Target"]])
+        edges.loc[multi.index, "Label"] = joined.reindex(at).fillna("").to_numpy()
+    df = edges.reset_index(drop=True)
+    edges_idx = np.stack([df.Source.map(node_idx).to_numpy(np.intp),
+                          df.Target.map(node_idx).to_numpy(np.intp)], axis=1)
+    edge_labels = df.Label.tolist()
+
+    # ── LAYOUTS PER REPULSIVE VALUE (cached) ─────────────────────────
+    # a cache file is reused only while its key matches the current graph,
+    # so unchanged relations (or label-only edits) skip the layout build
+    key = graph_key(node_list, edges_idx)
+    layouts = {}
+    missing = []
+    for k in REPEL_VALUES:
+        pos = read_layout(pathlib.Path(f"layout_{k}.json"), key)
+        if pos is not None:
+            layouts[k] = {n: np.asarray(p, dtype=np.float32) for n, p in pos.items()}
+        else:
+            missing.append(k)
+
+    # the per-k layouts are independent, so cold starts of big graphs build
+    # them in parallel (processes: the optimiser loop holds the GIL); small
+    # ones stay in-process, as each spawned worker re-imports pandas/scipy
+    if missing:
+        workers = min(len(missing), os.cpu_count() or 1)
+        if len(node_list) < POOL_MIN:
+            workers = 1
+        args = (repeat(len(node_list)), repeat(edges_idx), missing)
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as ex:
+                built = list(ex.map(lbfgs_layout, *args))
+        else:
+            built = map(lbfgs_layout, *args)
+        for k, P in zip(missing, built):
+            layouts[k] = dict(zip(node_list, P.astype(np.float32)))
+            write_layout(pathlib.Path(f"layout_{k}.json"), key, node_list, P)
+
+    DEFAULT_K = REPEL_VALUES[1]
+
+    node_text_plain = list(node_list)
+    node_text_bold  = [f"<b>{html.escape(t)}</b>" for t in node_text_plain]
+    node_files      = [note_files.get(n, "") for n in node_list]
+
+    # per-node position matrices (row i ↔ node_list[i]), built once per k
+    base_P    = {k: np.stack([layouts[k][n] for n in node_list]) for k in REPEL_VALUES}
+
+    # component centroids of the default layout, summed in one pass; the
+    # offset depends only on pos0, so it is shared by every k
+    A = csr_matrix((np.ones(len(edges_idx), dtype=np.int8),
+                    (edges_idx[:, 0], edges_idx[:, 1])), shape=(len(node_list),)*2)
+    comp_id  = connected_components(A, directed=False)[1]   # ignores edge direction
+    pos0     = base_P[DEFAULT_K]
+    sums     = np.zeros((comp_id.max()+1, 3))
+    np.add.at(sums, comp_id, pos0)
+    centroid = sums / np.bincount(comp_id)[:, None]
+    offset   = centroid[comp_id].astype(np.float32)
+
+    # ── COORD ARRAYS PER SPACING ─────────────────────────────────────
+    def segments(P0, P1):
+        """x/y/z rows of P0→P1 segments, NaN-separated (Plotly draws a gap)."""
+        buf = np.empty((3, 3*len(P0)), dtype=np.float32)
+        buf[:, 0::3] = P0.T
+        buf[:, 1::3] = P1.T
+        buf[:, 2::3] = np.nan
+        return buf
+
+    def arrays_for(k, sp):
+        P = base_P[k] + (sp-1)*offset
+        node_xyz = P.T
+
+        P0, P1 = P[edges_idx[:, 0]], P[edges_idx[:, 1]]
+        edge  = segments(P0, P1)
+        arrow = segments(P1 - ARROW_FRAC*(P1-P0), P1)
+        mid   = 0.5*(P0 + P1)
+
+        return dict(node=node_xyz,
+                    edge=edge,
+                    arrow=arrow,
+                    edge_lbl=(mid[:, 0], mid[:, 1], mid[:, 2], edge_labels),
+                    node_lbl=node_xyz)
+
+    # ── TRACE FACTORY ────────────────────────────────────────────────
+    def sc3d(x, y, z, **kw):
+        t = go.Scatter3d(x=x, y=y, z=z, **kw); t.uirevision = "static"; return t
+
+    a1 = arrays_for(DEFAULT_K, 1)
+
+    edge_t  = sc3d(*a1["edge"],  mode="lines", line=dict(width=1), hoverinfo="none")
+    arrow_t = sc3d(*a1["arrow"], mode="lines", line=dict(width=4),
+                   hoverinfo="none", visible=False)
+    lx,ly,lz,lt = a1["edge_lbl"]
+    edge_lbl_t = sc3d(lx,ly,lz, mode="text", text=lt,
+                      hoverinfo="none", visible=False)
+
+    # Node-label trace (ON by default)
+    node_lbl_t = sc3d(*a1["node_lbl"],
+        mode="markers+text",
+        marker=dict(size=12, symbol="square", color="#fff7b2", line=dict(width=0)),
+        text=node_text_bold,
+        textfont=dict(color="black"),
+        hoverinfo="none",
+        customdata=node_files,
+        visible=True)                      # ← now visible by default
+
+    # Node spheres (OFF by default)
+    node_t = sc3d(*a1["node"], mode="markers",
+                  marker=dict(size=6, symbol="diamond", opacity=0.85),
+                  hovertext=node_text_plain,
+                  customdata=node_files,
+                  visible=False)           # ← now hidden by default
+
+    fig = go.Figure(data=[edge_t, arrow_t, edge_lbl_t, node_lbl_t, node_t])
+
+    # ── SLIDER (restyle) ─────────────────────────────────────────────
+    # Only the per-k layouts, the centroid offset and the edge index are
+    # shipped (as base64 typed arrays); the page rebuilds P = base_P[k] +
+    # (s-1)*offset and the edge/arrow/label coordinates on slider change.
+    def b64(a, dtype):
+        return base64.b64encode(np.ascontiguousarray(a, dtype=dtype).tobytes()).decode()
+
+    layout_js = orjson.dumps(dict(
+        base_P=[b64(base_P[k], "<f4") for k in REPEL_VALUES],
+        offset=b64(offset, "<f4"),
+        edges_idx=b64(edges_idx, "<i4"),
+    )).decode()
+
+    # Create dummy steps that will be handled by JavaScript
+    steps = []
+    for i, s in enumerate(SPACING_VALUES):
+        steps.append(dict(
+            label=str(s),
+            method="relayout",
+            args=[{}]  # Empty args, will be handled by JS
+        ))
+
+    repel_steps = []
+    for j, k in enumerate(REPEL_VALUES):
+        repel_steps.append(dict(
+            label=str(k),
+            method="relayout",
+            args=[{}]  # Empty args, will be handled by JS
+        ))
+
+    fig.update_layout(
+        sliders=[
+            dict(steps=steps, active=SPACING_VALUES.index(1),
+                 x=0.02, y=-0.05, xanchor="left", len=0.45,
+                 currentvalue=dict(visible=False)),
+            dict(steps=repel_steps, active=REPEL_VALUES.index(DEFAULT_K),
+                 x=0.55, y=-0.05, xanchor="left", len=0.4,
+                 currentvalue=dict(visible=False))
+        ],
+
+        # ── SINGLE-TOGGLE BUTTONS ────────────────────────────────────
+        updatemenus=[dict(
+            type="buttons", x=1.05, y=0.8,
+            buttons=[
+                dict(label="⚲ Edge labels",
+                     method="restyle",
+                     args=[{"visible":[True]}, [2]],
+                     args2=[{"visible":[False]}, [2]]),
+
+                dict(label="⇢ Arrowheads",
+                     method="restyle",
+                     args=[{"visible":[True]}, [1]],
+                     args2=[{"visible":[False]}, [1]]),
+
+                dict(label="🔤 Node labels",
+                     method="restyle",
+                     args=[{"visible":[True]}, [3]],
+                     args2=[{"visible":[False]}, [3]])
+            ]
+        )],
+
+        scene=dict(xaxis_visible=False, yaxis_visible=False, zaxis_visible=False, dragmode='orbit'),
+        margin=dict(l=0, r=0, t=0, b=0),
+        clickmode="event+select"
+    )
+
+    def js(x):
+        """JSON literal safe to inline in a <script> block."""
+        return json.dumps(x).replace("</", "<\\/")
+
+    CLICK_JS = f"""
 var SPACING_VALUES = {json.dumps(SPACING_VALUES)};
 var REPEL_VALUES = {json.dumps(REPEL_VALUES)};
-var arrays = {arrays_js};
-var node_text_bold = {json.dumps(node_text_bold)};
-var node_text_plain = {json.dumps(node_text_plain)};
-var node_files = {json.dumps(node_files)};
+var ARROW_FRAC = {ARROW_FRAC};
+var layout_b64 = {layout_js};
+var node_text_bold = {js(node_text_bold)};
+var node_text_plain = {js(node_text_plain)};
+var node_files = {js(node_files)};
 
 // Initialize current values
 var current_spacing_idx = {SPACING_VALUES.index(1)};
@@ -209,6 +461,44 @@ var current_repel_idx = {REPEL_VALUES.index(DEFAULT_K)};
 
 var plot = document.getElementsByClassName('plotly-graph-div')[0];
 
+// Decode the layout buffers once
+function decode(b64, T) {{
+    var bin = atob(b64), bytes = new Uint8Array(bin.length);
+    for (var i = 0; i < bin.length; i++) bytes[i] = bin.charCodeAt(i);
+    return new T(bytes.buffer);
+}}
+var base_P = layout_b64.base_P.map(function(b) {{ return decode(b, Float32Array); }});
+var offset = decode(layout_b64.offset, Float32Array);
+var edges_idx = decode(layout_b64.edges_idx, Int32Array);
+var N = offset.length / 3, E = edges_idx.length / 2;
+
+// Coordinate buffers, allocated once and refilled on every slider change
+function buffers(n, gap) {{
+    return [0, 1, 2].map(function() {{
+        var a = new Float32Array(n); if (gap) a.fill(NaN); return a;
+    }});
+}}
+var P = new Float32Array(3*N);
+var node = buffers(N), mid = buffers(E), edge = buffers(3*E, true), arrow = buffers(3*E, true);
+
+function computeLayout() {{
+    var B = base_P[current_repel_idx];
+    var f = SPACING_VALUES[current_spacing_idx] - 1;
+    for (var i = 0; i < 3*N; i++) P[i] = B[i] + f*offset[i];
+    for (var n = 0; n < N; n++)
+        for (var a = 0; a < 3; a++) node[a][n] = P[3*n + a];
+    for (var e = 0; e < E; e++) {{
+        var u = 3*edges_idx[2*e], v = 3*edges_idx[2*e + 1];
+        for (var a = 0; a < 3; a++) {{
+            var p0 = P[u + a], p1 = P[v + a];
+            edge[a][3*e] = p0;  edge[a][3*e + 1] = p1;
+            arrow[a][3*e] = p1 - ARROW_FRAC*(p1 - p0);  arrow[a][3*e + 1] = p1;
+            mid[a][e] = 0.5*(p0 + p1);
+        }}
+    }}
+}}
+computeLayout();
+
 // Create search input
 var searchContainer = document.createElement('div');
 searchContainer.style.cssText = 'position: absolute; top: 10px; left: 10px; z-index: 1000;';
@@ -226,49 +516,36 @@ plot.parentElement.appendChild(searchContainer);
 var searchInput = document.getElementById('nodeSearch');
 var clearButton = document.getElementById('clearSearch');
 
+var node_text_lower = node_text_plain.map(function(t) {{ return t.toLowerCase(); }});
+var shown = new Int32Array(N);   // indices of the nodes matching the search
+
 function filterNodes() {{
     var searchTerm = searchInput.value.toLowerCase();
-    
-    if (searchTerm === '') {{
-        // Show all nodes
-        var allVisible = new Array(node_text_plain.length).fill(true);
-        updateNodeVisibility(allVisible);
-    }} else {{
-        // Filter nodes
-        var visibility = node_text_plain.map(function(text) {{
-            return text.toLowerCase().includes(searchTerm);
-        }});
-        updateNodeVisibility(visibility);
-    }}
+    var count = 0;
+    for (var i = 0; i < N; i++)
+        if (searchTerm === '' || node_text_lower[i].includes(searchTerm)) shown[count++] = i;
+    updateNodeVisibility(shown.subarray(0, count));
 }}
 
-function updateNodeVisibility(visibility) {{
-    var k = REPEL_VALUES[current_repel_idx];
-    var s = SPACING_VALUES[current_spacing_idx];
-    var a = arrays[k][s];
-    
-    // Filter coordinates and text based on visibility
-    var filtered_x = [];
-    var filtered_y = [];
-    var filtered_z = [];
-    var filtered_text = [];
-    var filtered_customdata = [];
-    
-    for (var i = 0; i < visibility.length; i++) {{
-        if (visibility[i]) {{
-            filtered_x.push(a.node_lbl[0][i]);
-            filtered_y.push(a.node_lbl[1][i]);
-            filtered_z.push(a.node_lbl[2][i]);
-            filtered_text.push(node_text_bold[i]);
-            filtered_customdata.push(node_files[i]);
-        }}
+function updateNodeVisibility(idx) {{
+    // Gather the visible nodes' coordinates (typed) and text
+    var xyz = [0, 1, 2].map(function(a) {{
+        var out = new Float32Array(idx.length);
+        for (var j = 0; j < idx.length; j++) out[j] = node[a][idx[j]];
+        return out;
+    }});
+    var filtered_text = new Array(idx.length);
+    var filtered_customdata = new Array(idx.length);
+    for (var j = 0; j < idx.length; j++) {{
+        filtered_text[j] = node_text_bold[idx[j]];
+        filtered_customdata[j] = node_files[idx[j]];
     }}
-    
+
     // Update only the node label trace
     Plotly.restyle(plot, {{
-        'x': [filtered_x],
-        'y': [filtered_y],
-        'z': [filtered_z],
+        'x': [xyz[0]],
+        'y': [xyz[1]],
+        'z': [xyz[2]],
         'text': [filtered_text],
         'customdata': [filtered_customdata]
     }}, [3]);
@@ -300,16 +577,28 @@ plot.on('plotly_sliderchange', function(eventdata){{
         // Repel slider
         current_repel_idx = eventdata.slider.active;
     }}
-    
+    computeLayout();
+
+    // Move edges, arrowheads, edge labels and node markers
+    Plotly.restyle(plot, {{
+        'x': [edge[0], arrow[0], mid[0], node[0]],
+        'y': [edge[1], arrow[1], mid[1], node[1]],
+        'z': [edge[2], arrow[2], mid[2], node[2]]
+    }}, [0, 1, 2, 4]);
+
     // Apply search filter when sliders change
     filterNodes();
 }});
 """
 
-# --- write the updated file ---
-fig.write_html("graph.html", include_plotlyjs="cdn",
-               auto_open=False, post_script=CLICK_JS)
+    # --- write the updated file ---
+    fig.write_html("graph.html", include_plotlyjs="cdn",
+                   auto_open=False, post_script=CLICK_JS)
+
+    # --- bring/reload the page in the browser ---
+    import webbrowser
+    webbrowser.open("http://localhost:8000/graph.html", new=0, autoraise=True)
+
 
-# --- bring/reload the page in the browser ---
-import webbrowser
-webbrowser.open("http://localhost:8000/graph.html", new=0, autoraise=True)
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,7 @@ Watches Neo4j for changes and syncs them to:
 Uses polling to detect Neo4j changes.
 """
 
+import hashlib
 import os
 import re
 import time
@@ -63,6 +64,10 @@ def _unsnake_to_filename(id: str, existing_path: Optional[str] = None) -> str:
     
     return f"{name}{ext}" if ext else f"{name}.txt"
 
+def _digest(text: str) -> bytes:
+    """Short content hash used to skip rewriting an unchanged facts.pl."""
+    return hashlib.blake2b(text.encode(), digest_size=16).digest()
+
 class Neo4jWatcher:
     def __init__(self, poll_interval: float = 2.0):
         self.poll_interval = poll_interval
@@ -71,43 +76,42 @@ class Neo4jWatcher:
         # State tracking
         self.last_nodes: Dict[str, Dict] = {}  # id -> {path, ...}
         self.last_rels: Set[Tuple[str, str, str]] = set()  # (from_id, to_id, type)
+        self._facts_digest: Optional[bytes] = None  # of the last facts.pl written
+        if FACTS_FILE.exists():
+            self._facts_digest = _digest(FACTS_FILE.read_text())
         
         # Initialize state
         self._update_state()
     
-    def _query_nodes(self) -> Dict[str, Dict]:
-        """Get all Note nodes from Neo4j."""
-        with driver.session(database=DB) as session:
-            result = session.run(
-                "MATCH (n:Note) "
-                "RETURN n.id AS id, n.path AS path, "
-                "properties(n) AS props"
-            )
-            return {
-                record["id"]: {
-                    "path": record["path"],
-                    "props": record["props"]
-                }
-                for record in result
-            }
+    @staticmethod
+    def _query_nodes(tx) -> Dict[str, Dict]:
+        """Get all Note nodes (id and path only) from Neo4j."""
+        result = tx.run("MATCH (n:Note) RETURN n.id AS id, n.path AS path")
+        return {record["id"]: {"path": record["path"]} for record in result}
     
-    def _query_relationships(self) -> Set[Tuple[str, str, str]]:
+    @staticmethod
+    def _query_relationships(tx) -> Set[Tuple[str, str, str]]:
         """Get all relationships between Note nodes."""
+        result = tx.run(
+            "MATCH (a:Note)-[r]->(b:Note) "
+            "RETURN a.id AS from_id, b.id AS to_id, type(r) AS rel_type"
+        )
+        return {
+            (record["from_id"], record["to_id"], record["rel_type"])
+            for record in result
+        }
+    
+    def _query_state(self) -> Tuple[Dict[str, Dict], Set[Tuple[str, str, str]]]:
+        """Read nodes and relationships in one session and transaction."""
         with driver.session(database=DB) as session:
-            result = session.run(
-                "MATCH (a:Note)-[r]->(b:Note) "
-                "RETURN a.id AS from_id, b.id AS to_id, type(r) AS rel_type"
+            return session.execute_read(
+                lambda tx: (self._query_nodes(tx), self._query_relationships(tx))
             )
-            return {
-                (record["from_id"], record["to_id"], record["rel_type"])
-                for record in result
-            }
     
     def _update_state(self):
         """Update internal state from Neo4j."""
         try:
-            self.last_nodes = self._query_nodes()
-            self.last_rels = self._query_relationships()
+            self.last_nodes, self.last_rels = self._query_state()
         except Exception as e:
             print(f"[neo4j-watcher] Error updating state: {e}")
     
@@ -116,8 +120,16 @@ class Neo4jWatcher:
         # Ensure files directory exists
         KNOWLEDGE.mkdir(exist_ok=True)
         
-        # Track which files should exist
-        expected_files = set()
+        # Snapshot files/ once; paths elsewhere fall back to a stat
+        on_disk = {entry.path for entry in os.scandir(KNOWLEDGE) if entry.is_file()}
+        
+        def exists(file_path: Path) -> bool:
+            if file_path.parent == KNOWLEDGE:
+                return str(file_path) in on_disk
+            return file_path.exists()
+        
+        # Nodes without a path get one, written back to Neo4j in one batch
+        new_paths = []
         
         # Handle new and modified nodes
         for node_id, node_data in current_nodes.items():
@@ -125,33 +137,37 @@ class Neo4jWatcher:
             
             if not path:
                 # Node exists but has no path - create a file for it
-                filename = _unsnake_to_filename(node_id)
-                path = f"files/{filename}"
-                # Update Neo4j with the path
-                with driver.session(database=DB) as session:
-                    session.run(
-                        "MATCH (n:Note {id: $id}) SET n.path = $path",
-                        id=node_id, path=path
-                    )
-                print(f"[neo4j-watcher] Added path to node {node_id}: {path}")
+                path = f"files/{_unsnake_to_filename(node_id)}"
+                new_paths.append({"id": node_id, "path": path})
             
             file_path = ROOT / path
-            expected_files.add(file_path)
             
-            # Create file if it doesn't exist
-            if not file_path.exists():
-                file_path.parent.mkdir(parents=True, exist_ok=True)
-                file_path.touch()
-                print(f"[neo4j-watcher] Created file: {path}")
-            
-            # Handle renames (same id, different path)
+            # Handle renames (same id, different path) before creating
             if node_id in previous_nodes:
                 old_path = previous_nodes[node_id].get("path")
                 if old_path and old_path != path:
                     old_file = ROOT / old_path
-                    if old_file.exists() and not file_path.exists():
+                    if exists(old_file) and not exists(file_path):
                         old_file.rename(file_path)
+                        on_disk.discard(str(old_file))
+                        on_disk.add(str(file_path))
                         print(f"[neo4j-watcher] Renamed: {old_path} → {path}")
+            
+            # Create file if it doesn't exist
+            if not exists(file_path):
+                file_path.parent.mkdir(parents=True, exist_ok=True)
+                file_path.touch()
+                on_disk.add(str(file_path))
+                print(f"[neo4j-watcher] Created file: {path}")
+        
+        if new_paths:
+            with driver.session(database=DB) as session:
+                session.run(
+                    "UNWIND $rows AS r MATCH (n:Note {id: r.id}) SET n.path = r.path",
+                    rows=new_paths
+                )
+            for row in new_paths:
+                print(f"[neo4j-watcher] Added path to node {row['id']}: {row['path']}")
         
         # Handle deleted nodes
         for node_id, node_data in previous_nodes.items():
@@ -159,7 +175,7 @@ class Neo4jWatcher:
                 path = node_data.get("path")
                 if path:
                     file_path = ROOT / path
-                    if file_path.exists():
+                    if exists(file_path):
                         file_path.unlink()
                         print(f"[neo4j-watcher] Deleted file: {path}")
     
@@ -186,14 +202,19 @@ class Neo4jWatcher:
             rel_label = rel_type.lower().replace("_", " ")
             lines.append(f"rel({from_id}, {to_id}, '{rel_label}').")
         
-        # Write to file
+        # Write to file, only if it differs from what we last wrote; the
+        # tmp file + os.replace means readers never see a half-written file
         new_content = "\n".join(lines) + "\n" if lines else ""
+        digest = _digest(new_content)
+        if digest == self._facts_digest:
+            return
         
         try:
-            current_content = FACTS_FILE.read_text() if FACTS_FILE.exists() else ""
-            if current_content.strip() != new_content.strip():
-                FACTS_FILE.write_text(new_content)
-                print(f"[neo4j-watcher] Updated facts.pl")
+            tmp = FACTS_FILE.with_suffix(".pl.tmp")
+            tmp.write_text(new_content)
+            os.replace(tmp, FACTS_FILE)
+            self._facts_digest = digest
+            print(f"[neo4j-watcher] Updated facts.pl")
         except Exception as e:
             print(f"[neo4j-watcher] Error updating facts.pl: {e}")
     
@@ -204,8 +225,7 @@ class Neo4jWatcher:
         while not self.stop_event.is_set():
             try:
                 # Get current state
-                current_nodes = self._query_nodes()
-                current_rels = self._query_relationships()
+                current_nodes, current_rels = self._query_state()
                 
                 # Check for changes
                 nodes_changed = current_nodes != self.last_nodes
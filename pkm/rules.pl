@@ -37,7 +37,7 @@ export_rel_csv(File) :-
 
 %% viz (visualize)
 %%  Exports rel/3 facts to 'relations.csv' and runs 'python3 3dgraph.py'
+%%  (3dgraph.py rebuilds its layout_*.json caches when the graph changes)
 viz :-
     export_rel_csv('relations.csv'),
-    shell("rm layout_*"),
     shell("python3 3dgraph.py").
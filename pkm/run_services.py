@@ -1,42 +1,82 @@
 #!/usr/bin/env python3
 """
 run_services.py – launch filewatcher.py, neo4j_to_filesystem_watcher.py,
-periodically run load_notes.sh every 10 s, and start a simple HTTP server.
+run load_notes.sh after facts.pl changes, and start a simple HTTP server.
 
 Usage:
     python3 run_services.py          # serves cwd on :8000 and refreshes Neo4j ↔︎ files
 """
 
+from __future__ import annotations
+
 import subprocess
 import sys
 import threading
-import time
 from pathlib import Path
 
+from watchdog.events import FileSystemEventHandler
+from watchdog.observers import Observer
+
 # ── Paths ─────────────────────────────────────────────────────────────────────
 HERE = Path(__file__).resolve().parent
 WATCHER = HERE / "filewatcher.py"
 NEO4J_WATCHER = HERE / "neo4j_to_filesystem_watcher.py"
 LOAD_NOTES = HERE / "load_notes.sh"  # make sure this is executable (chmod +x)
+FACTS_FILE = HERE / "facts.pl"
+
+# ── Debounced loader ──────────────────────────────────────────────────────────
+
+class _DebouncedLoader(FileSystemEventHandler):
+    """Run load_notes.sh once facts.pl has been quiet for *delay* seconds.
+
+    Every change restarts the timer, so a burst of saves costs one run;
+    like filewatcher.FactsHandler, runs never overlap.
+    """
+
+    def __init__(self, delay: float = 2.0) -> None:
+        self.delay = delay
+        self._timer: threading.Timer | None = None
+        self._lock = threading.Lock()      # guards _timer
+        self._running = threading.Lock()   # one load_notes.sh at a time
+
+    def _run(self) -> None:
+        with self._running:
+            try:
+                subprocess.run([str(LOAD_NOTES)], check=False)
+            except FileNotFoundError:
+                # fail fast if the script is missing so the user knows why
+                sys.stderr.write(f"⚠️  {LOAD_NOTES} not found. Skipping…\n")
+
+    def schedule(self) -> None:
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.delay, self._run)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def on_any_event(self, event) -> None:  # type: ignore[override]
+        if event.is_directory or event.event_type not in ("created", "modified", "moved"):
+            return
+        paths = (event.src_path, getattr(event, "dest_path", ""))
+        if str(FACTS_FILE) in paths:
+            self.schedule()
 
-# ── Periodic loader thread ────────────────────────────────────────────────────
 
-def _periodic_loader(interval: int = 20) -> None:
-    """Run load_notes.sh every *interval* seconds until the program exits."""
-    while True:
-        try:
-            subprocess.run([str(LOAD_NOTES)], check=False)
-        except FileNotFoundError:
-            # fail fast if the script is missing so the user knows why
-            sys.stderr.write(f"⚠️  {LOAD_NOTES} not found. Skipping…\n")
-        time.sleep(interval)
+def _start_loader(delay: float = 2.0) -> Observer:
+    """Watch facts.pl in the background and load it into Neo4j on change."""
+    observer = Observer()
+    observer.daemon = True
+    observer.schedule(_DebouncedLoader(delay), str(HERE), recursive=False)
+    observer.start()
+    return observer
 
 # ── Main entry ────────────────────────────────────────────────────────────────
 
 def main() -> None:
-    # Start the periodic loader in the background (daemon thread so it stops
-    # automatically when the main program exits).
-    # threading.Thread(target=_periodic_loader, daemon=True).start()
+    # Load facts.pl into Neo4j whenever it changes (daemon observer thread, so
+    # it stops automatically when the main program exits).
+    # _start_loader()
 
     # Launch both watchers in the background.
     watcher_proc = subprocess.Popen([sys.executable, str(WATCHER)])
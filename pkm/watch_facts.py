@@ -2,8 +2,14 @@
 
 from __future__ import annotations
 
+import atexit
+import os
+import queue
+import signal
 import subprocess
+import threading
 import time
+import uuid
 from pathlib import Path
 
 from watchdog.events import FileSystemEventHandler
@@ -11,20 +17,112 @@ from watchdog.observers import Observer
 
 FACTS_FILE = Path(__file__).with_name("facts.pl")
 RULES_FILE = Path(__file__).with_name("rules.pl")
+# Seconds before a stuck goal is killed; unset or 0 waits indefinitely.
+GOAL_TIMEOUT = float(os.getenv("VIZ_TIMEOUT", "0")) or None
+
+
+# Terms ``run(Goal, Tag)`` are read from stdin; Tag is printed on a line of
+# its own once Goal is done.  The empty prompt keeps read/1 from writing
+# "|: " to stdout.
+READ_LOOP = (
+    "prompt(_, ''), repeat, read(Term),"
+    " ( Term == end_of_file -> halt"
+    " ; Term = run(Goal, Tag),"
+    "   ignore(catch(Goal, E, print_message(error, E))),"
+    "   format('~N~w~n', [Tag]), flush_output, fail )"
+)
+
+
+class Prolog:
+    """One long-lived ``swipl`` with ``rules.pl`` loaded, fed goals on stdin.
+
+    Saves the engine start-up and ``rules.pl`` consult on every run; ``make``
+    before each goal reloads ``facts.pl``/``rules.pl`` if they changed.
+    """
+
+    def __init__(self) -> None:
+        self._proc: subprocess.Popen[str] | None = None
+        self._lines: queue.Queue[str | None] = queue.Queue()
+        self._lock = threading.Lock()   # one goal in flight at a time
+
+    def _start(self) -> subprocess.Popen[str]:
+        proc = subprocess.Popen(
+            ["swipl", "-q", "--no-tty", "-s", str(RULES_FILE), "-g", READ_LOOP],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            bufsize=1,
+            start_new_session=True,   # own group, so killpg reaches shell/1 children
+        )
+        atexit.register(self._killpg, proc, signal.SIGTERM)
+        self._lines = queue.Queue()
+        threading.Thread(
+            target=self._pump, args=(proc.stdout, self._lines), daemon=True
+        ).start()
+        return proc
+
+    @staticmethod
+    def _pump(stdout, lines: queue.Queue[str | None]) -> None:
+        """Forward swipl's stdout line by line; None marks EOF."""
+        for line in stdout:
+            lines.put(line)
+        lines.put(None)
+
+    @staticmethod
+    def _killpg(proc: subprocess.Popen[str], sig: int) -> None:
+        """Signal swipl and anything it spawned (e.g. ``python3 3dgraph.py``)."""
+        try:
+            os.killpg(proc.pid, sig)
+        except ProcessLookupError:
+            pass
+
+    def _stop(self) -> None:
+        if self._proc is not None:
+            self._killpg(self._proc, signal.SIGKILL)
+            self._proc.wait()
+            self._proc = None
+
+    def run(self, goal: str) -> None:
+        """Run *goal* and wait for it, echoing anything it prints."""
+        with self._lock:
+            if self._proc is None or self._proc.poll() is not None:
+                self._proc = self._start()
+            assert self._proc.stdin
+            tag = f"done_{uuid.uuid4().hex}"
+            try:
+                self._proc.stdin.write(f"run((make, ({goal})), {tag}).\n")
+                self._proc.stdin.flush()
+            except OSError:
+                self._stop()
+                print(f"swipl exited before running {goal}")
+                return
+            deadline = None if GOAL_TIMEOUT is None else time.monotonic() + GOAL_TIMEOUT
+            while True:
+                try:
+                    line = self._lines.get(
+                        timeout=None if deadline is None
+                        else max(0.0, deadline - time.monotonic())
+                    )
+                except queue.Empty:
+                    print(f"{goal} timed out after {GOAL_TIMEOUT:.0f}s; restarting swipl")
+                    self._stop()
+                    return
+                if line is None:
+                    print(f"swipl exited while running {goal}")
+                    self._stop()
+                    return
+                if line.rstrip("\n").endswith(tag):
+                    print(line.rstrip("\n")[: -len(tag)], end="")
+                    return
+                print(line, end="")
+
+
+PROLOG = Prolog()
 
 
 def run_viz() -> None:
     """Invoke ``viz`` in ``rules.pl`` via SWI-Prolog."""
-    subprocess.run([
-        "swipl",
-        "-q",
-        "-s",
-        str(RULES_FILE),
-        "-g",
-        "viz",
-        "-t",
-        "halt",
-    ])
+    PROLOG.run("viz")
 
 
 class Handler(FileSystemEventHandler):
@@ -41,6 +139,14 @@ class Handler(FileSystemEventHandler):
     def on_created(self, event) -> None:  # type: ignore[override]
         self.on_modified(event)
 
+    # Atomic rewrites (temp file + os.replace) arrive as a move onto it
+    def on_moved(self, event) -> None:  # type: ignore[override]
+        if event.is_directory:
+            return
+        if Path(event.dest_path) == FACTS_FILE:
+            print(f"{FACTS_FILE} replaced, running viz...")
+            run_viz()
+
 
 def main() -> None:
     observer = Observer()
@@ -4,13 +4,35 @@
 *  rename inside  → rewrites the old ``note(...)`` line, **updates any
    matching ``rel(...)`` lines**, and appends a new ``note(...)``  
 *  move in / out  → handled as add / remove
+
+``filewatcher.py`` imports its files/ side from here.
 """
 
 from __future__ import annotations
 
+__all__ = [
+    "KNOWLEDGE_DIR",
+    "FACTS_FILE",
+    "note_name",
+    "load_known_files",
+    "append_note",
+    "append_notes",
+    "remove_note",
+    "remove_notes",
+    "update_rels",
+    "sync_existing",
+    "Handler",
+    "main",
+]
+
+import json
+import os
 import re
-import time
+import signal
+import tempfile
+import threading
 from pathlib import Path
+from typing import Callable, Iterable
 
 from watchdog.events import (
     FileSystemEventHandler,
@@ -25,58 +47,145 @@ from watchdog.observers import Observer
 # ─────────────────────────────────────────────────────────────────────────────
 KNOWLEDGE_DIR = Path(__file__).with_name("files")   # folder to watch
 FACTS_FILE = Path(__file__).with_name("facts.pl")   # Prolog knowledge base
+KNOWN_CACHE = FACTS_FILE.with_suffix(".pl.known.json")  # parsed note paths
+INOTIFY_QUEUE = Path("/proc/sys/fs/inotify/max_queued_events")
+MIN_QUEUED_EVENTS = 65536   # below this, bulk copies can overflow the queue
+_WATCH_DIR_STR = str(KNOWLEDGE_DIR)                     # for event path compares
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Regex helpers
 # ─────────────────────────────────────────────────────────────────────────────
-NOTE_RE = re.compile(r"note\([^,]+,\s*'([^']+)'\)\.")
-LOWER_CASE = re.compile(r"[a-z]")
+NOTE_RE = re.compile(r"[ \t]*note\(([^,]+),\s*'([^']+)'\)\.")
+_NONWORD_RE = re.compile(r"\W+")
+# ASCII non-word characters → space, so str.split() finds the \W+ runs
+_SNAKE_TABLE = str.maketrans(
+    {c: " " for c in map(chr, range(128)) if not (c.isalnum() or c == "_")}
+)
 
 
 def _to_snake_case(s: str) -> str:
-    return re.sub(r"\W+", "_", s).strip("_").lower()
+    if s.isascii():
+        return "_".join(s.translate(_SNAKE_TABLE).split()).strip("_").lower()
+    return _NONWORD_RE.sub("_", s).strip("_").lower()
 
 
 def format(name: str) -> str:
     """Convert to snake_case; prepend 'nn_' if it doesn't start with a-z."""
     snaked = _to_snake_case(name)
-    return "nn_" + snaked if not LOWER_CASE.match(snaked[0]) else snaked
+    return snaked if "a" <= snaked[:1] <= "z" else "nn_" + snaked
 
 
 # ─────────────────────────────────────────────────────────────────────────────
 # facts.pl helpers
 # ─────────────────────────────────────────────────────────────────────────────
-def load_known_files() -> set[str]:
-    """Return a set of 'files/<name>' already present in facts.pl."""
-    known: set[str] = set()
-    if FACTS_FILE.exists():
-        for line in FACTS_FILE.read_text().splitlines():
-            m = NOTE_RE.match(line.strip())
+def _stem(file_name: str) -> str:
+    """``Path(file_name).stem`` without building a Path."""
+    return file_name.rpartition(".")[0] or file_name
+
+
+def note_name(file_name: str) -> str:
+    """The note atom a new file gets: ``format`` of its stem."""
+    return format(_stem(file_name))
+
+
+def load_known_files() -> dict[str, str]:
+    """Map each files/ entry already in facts.pl to its note atom.
+
+    Keys are bare file names (``foo.md``); the ``files/`` prefix only
+    exists on disk, in the note(...) lines.  The result is cached in
+    ``KNOWN_CACHE`` under facts.pl's (mtime, size), so an unchanged
+    facts.pl is not re-parsed on the next start.
+    """
+    known: dict[str, str] = {}
+    if not FACTS_FILE.exists():
+        return known
+    st = FACTS_FILE.stat()
+    stamp = [st.st_mtime_ns, st.st_size]
+    try:
+        cached = json.loads(KNOWN_CACHE.read_text(encoding="utf-8"))
+        if cached["stamp"] == stamp:
+            return dict(cached["notes"])
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    with FACTS_FILE.open(encoding="utf-8") as f:
+        for line in f:
+            m = NOTE_RE.match(line)
             if m:
-                known.add(m.group(1))
+                known[m.group(2).removeprefix("files/")] = m.group(1).strip()
+    try:
+        KNOWN_CACHE.write_text(
+            json.dumps({"stamp": stamp, "notes": known}), encoding="utf-8"
+        )
+    except OSError:
+        pass
     return known
 
 
+def append_notes(notes: dict[str, str]) -> None:
+    """Append a note(...) line per file name → note atom, in a single write."""
+    entries = [f"note({note}, 'files/{name}').\n" for name, note in notes.items()]
+    with FACTS_FILE.open("a", encoding="utf-8") as f:
+        f.write("".join(entries))
+    for entry in entries:
+        print(f"Appended: {entry.strip()}")
+
+
 def append_note(file_name: str) -> None:
-    note_name = format(Path(file_name).stem)
-    entry = f"note({note_name}, 'files/{file_name}').\n"
-    with FACTS_FILE.open("a") as f:
-        f.write(entry)
-    print(f"Appended: {entry.strip()}")
+    append_notes({file_name: note_name(file_name)})
+
+
+def _rewrite_facts(edit: Callable[[str], str | None]) -> bool:
+    """Stream facts.pl through *edit* into a temp file, then swap it in.
+
+    *edit* returns the line to keep (possibly changed) or None to drop it.
+    Returns whether any line was dropped or changed; if none was, facts.pl
+    is left untouched so its watchers don't fire for nothing.
+    """
+    changed = False
+    with FACTS_FILE.open(encoding="utf-8") as src, tempfile.NamedTemporaryFile(
+        "w", encoding="utf-8", dir=FACTS_FILE.parent, prefix=".facts.", delete=False
+    ) as tmp:
+        try:
+            for line in src:
+                out = edit(line)
+                if out != line:
+                    changed = True
+                if out is not None:
+                    tmp.write(out)
+        except BaseException:
+            changed = False
+            raise
+        finally:
+            if not changed:
+                os.unlink(tmp.name)
+    if not changed:
+        return False
+    os.chmod(tmp.name, FACTS_FILE.stat().st_mode)
+    os.replace(tmp.name, FACTS_FILE)
+    return True
 
 
 def remove_note(file_name: str) -> None:
-    target = f"files/{file_name}"
-    if not FACTS_FILE.exists():
+    remove_notes([file_name])
+
+
+def remove_notes(file_names: Iterable[str]) -> None:
+    """Drop the note(...) lines of several files in one rewrite."""
+    targets = {f"files/{name}" for name in file_names}
+    if not targets or not FACTS_FILE.exists():
+        return
+    if len(targets) >= 8:
+        # one alternation scans each line once instead of len(targets) times
+        pattern = re.compile("|".join(map(re.escape, targets)))
+        removed = _rewrite_facts(lambda line: None if pattern.search(line) else line)
+    else:
+        removed = _rewrite_facts(
+            lambda line: None if any(t in line for t in targets) else line
+        )
+    if not removed:
         return
-    with FACTS_FILE.open("r+") as f:
-        lines = f.readlines()
-        f.seek(0)
-        for line in lines:
-            if target not in line:
-                f.write(line)
-        f.truncate()
-    print(f"Removed note for: {target}")
+    for target in sorted(targets):
+        print(f"Removed note for: {target}")
 
 
 def update_rels(old_note: str, new_note: str) -> None:
@@ -84,91 +193,140 @@ def update_rels(old_note: str, new_note: str) -> None:
     if not FACTS_FILE.exists():
         return
     pattern = re.compile(rf"\b{re.escape(old_note)}\b")
-    changed = False
-    with FACTS_FILE.open("r+") as f:
-        lines = f.readlines()
-        f.seek(0)
-        for line in lines:
-            if line.strip().startswith("rel(") and pattern.search(line):
-                line = pattern.sub(new_note, line)
-                changed = True
-            f.write(line)
-        f.truncate()
-    if changed:
+
+    def edit(line: str) -> str:
+        if line.strip().startswith("rel("):
+            return pattern.sub(new_note, line)
+        return line
+
+    if _rewrite_facts(edit):
         print(f"Updated rels: {old_note} → {new_note}")
 
 
-def sync_existing(known: set[str]) -> None:
-    for path in KNOWLEDGE_DIR.iterdir():
-        if path.is_file() and not path.name.startswith(("._", ".DS_Store")):
-            rel = f"files/{path.name}"
-            if rel not in known:
-                append_note(path.name)
-                known.add(rel)
+def _ignore(name: str) -> bool:
+    """Finder metadata: .DS_Store and AppleDouble ``._*`` files."""
+    return name == ".DS_Store" or name.startswith("._")
+
+
+def sync_existing(known: dict[str, str]) -> None:
+    new_files: dict[str, str] = {}
+    with os.scandir(KNOWLEDGE_DIR) as it:
+        for entry in it:
+            name = entry.name
+            if _ignore(name) or name in known or not entry.is_file():
+                continue
+            known[name] = new_files[name] = note_name(name)
+    if new_files:
+        append_notes(new_files)
 
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Watchdog handler
 # ─────────────────────────────────────────────────────────────────────────────
 class Handler(FileSystemEventHandler):
-    def __init__(self, known: set[str]):
-        self.known = known
+    """Keeps ``known`` current per event; facts.pl is written in batches.
 
-    # ---------- helpers -----------------------------------------------------
-    @staticmethod
-    def _ignore(path: Path) -> bool:
-        return path.name.startswith(("._", ".DS_Store"))
+    Adds and removes are queued and flushed together once no event has
+    arrived for ``delay`` seconds, so a burst (an unzip, a bulk move) costs
+    one rewrite and one append instead of one per file.
+    """
 
-    def _maybe_add(self, path: Path) -> None:
-        if self._ignore(path):
-            return
-        rel = f"files/{path.name}"
-        if rel not in self.known:
-            append_note(path.name)
-            self.known.add(rel)
+    def __init__(self, known: dict[str, str], delay: float = 0.25):
+        self.known = known                 # file name → note atom
+        self.delay = delay
+        self._pending_add: dict[str, str] = {}
+        self._pending_remove: set[str] = set()
+        self._timer: threading.Timer | None = None
+        self._lock = threading.Lock()      # guards the queues and facts.pl
 
-    def _maybe_remove(self, path: Path) -> None:
-        if self._ignore(path):
+    # ---------- helpers -----------------------------------------------------
+    def _schedule(self) -> None:
+        if self._timer:
+            self._timer.cancel()
+        self._timer = threading.Timer(self.delay, self.flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def flush(self) -> None:
+        """Apply the queued removes, then the queued adds."""
+        with self._lock:
+            if self._pending_remove:
+                remove_notes(self._pending_remove)
+            if self._pending_add:
+                append_notes(self._pending_add)
+            self._pending_add, self._pending_remove = {}, set()
+
+    def _maybe_add(self, name: str, note: str | None = None) -> None:
+        if _ignore(name):
             return
-        rel = f"files/{path.name}"
-        if rel in self.known:
-            remove_note(path.name)
-            self.known.remove(rel)
+        with self._lock:
+            if name not in self.known:
+                note = note or note_name(name)
+                self.known[name] = self._pending_add[name] = note
+                self._schedule()
+
+    def _maybe_remove(self, name: str) -> None:
+        if _ignore(name):
+            return
+        with self._lock:
+            if name in self.known:
+                del self.known[name]
+                if name in self._pending_add:
+                    # never written yet, so there is nothing to remove
+                    del self._pending_add[name]
+                else:
+                    self._pending_remove.add(name)
+                self._schedule()
 
     # ---------- watchdog callbacks -----------------------------------------
     def on_created(self, event: FileCreatedEvent) -> None:  # type: ignore[override]
         if not event.is_directory:
-            self._maybe_add(Path(event.src_path))
+            self._maybe_add(os.path.basename(event.src_path))
 
     def on_deleted(self, event: FileDeletedEvent) -> None:  # type: ignore[override]
         if not event.is_directory:
-            self._maybe_remove(Path(event.src_path))
+            self._maybe_remove(os.path.basename(event.src_path))
 
     def on_moved(self, event: FileMovedEvent) -> None:  # type: ignore[override]
         if event.is_directory:
             return
 
-        src = Path(event.src_path)
-        dst = Path(event.dest_path)
+        src_dir, src = os.path.split(event.src_path)
+        dst_dir, dst = os.path.split(event.dest_path)
 
         # ── rename within the folder ───────────────────────────────────────
-        if src.parent == KNOWLEDGE_DIR and dst.parent == KNOWLEDGE_DIR:
-            old_note = format(src.stem)
-            new_note = format(dst.stem)
+        if src_dir == _WATCH_DIR_STR and dst_dir == _WATCH_DIR_STR:
+            old_note = self.known.get(src) or note_name(src)
+            new_note = note_name(dst)
             self._maybe_remove(src)
-            update_rels(old_note, new_note)
-            self._maybe_add(dst)
+            with self._lock:
+                update_rels(old_note, new_note)
+            self._maybe_add(dst, new_note)
             return
 
         # ── moved in ───────────────────────────────────────────────────────
-        if dst.parent == KNOWLEDGE_DIR:
+        if dst_dir == _WATCH_DIR_STR:
             self._maybe_add(dst)
 
         # ── moved out ──────────────────────────────────────────────────────
-        if src.parent == KNOWLEDGE_DIR:
+        if src_dir == _WATCH_DIR_STR:
             self._maybe_remove(src)
 
 
+def _check_inotify_queue() -> None:
+    """Warn when the kernel's inotify queue is small enough to drop events."""
+    try:
+        limit = int(INOTIFY_QUEUE.read_text())
+    except (OSError, ValueError):
+        return
+    if limit < MIN_QUEUED_EVENTS:
+        print(
+            f"Warning: fs.inotify.max_queued_events is {limit}; large bursts in "
+            f"{KNOWLEDGE_DIR} may be dropped. Raise it with "
+            f"`sysctl fs.inotify.max_queued_events={MIN_QUEUED_EVENTS}`."
+        )
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # Main loop
 # ─────────────────────────────────────────────────────────────────────────────
@@ -178,15 +336,23 @@ def main() -> None:
     sync_existing(known)
 
     print(f"Watching {KNOWLEDGE_DIR} …  Ctrl-C to exit.")
+    _check_inotify_queue()
+    handler = Handler(known)
     observer = Observer()
-    observer.schedule(Handler(known), str(KNOWLEDGE_DIR), recursive=False)
+    observer.schedule(handler, str(KNOWLEDGE_DIR), recursive=False)
+    stop = threading.Event()
+    # SIGTERM too: run_services.py stops the watchers with terminate()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stop.set())
     observer.start()
     try:
-        while True:
-            time.sleep(1)
-    except KeyboardInterrupt:
+        stop.wait()
+    except KeyboardInterrupt:  # platforms where the handler doesn't take
+        pass
+    finally:
         observer.stop()
-    observer.join()
+        observer.join()
+        handler.flush()
 
 
 if __name__ == "__main__":